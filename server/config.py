@@ -1,8 +1,31 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
+    env: str = "dev"  # "prod" disables the OpenAPI schema and docs
+
     database_url: str = "postgresql+asyncpg://localhost/collabcanvas"
+    # Transaction-mode pooler URL (Neon "-pooler" host / Supabase port 6543).
+    # Used by the app when set; migrations keep using the direct database_url.
+    # A pooler given as database_url is detected from its host/port as well.
+    database_url_pooled: str = ""
+    # Per worker: with uvicorn --workers N the app can hold
+    # N * (db_pool_size + db_max_overflow) connections, which Postgres'
+    # max_connections has to accommodate
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    # CA bundle used to verify the database's TLS certificate (defaults to certifi)
+    db_ssl_ca_file: str = ""
+    # Received Yjs messages buffered per WebSocket before reading pauses
+    ws_recv_queue: int = 256
+    # Outgoing messages buffered per WebSocket, and what to do when a slow
+    # client fills the buffer: wait for room ("block"), drop queued awareness
+    # updates ("drop_oldest", disconnects if there are none), or "disconnect"
+    ws_send_queue: int = 1000
+    ws_bp_policy: Literal["block", "drop_oldest", "disconnect"] = "drop_oldest"
+    # Skip queued awareness updates superseded by a newer one for the same clients
+    ws_coalesce_awareness: bool = True
     redis_url: str = "redis://localhost:6379"
     secret_key: str = "dev-secret-key-change-in-production"
 
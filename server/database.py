@@ -1,34 +1,104 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import func
+import certifi
+import ssl
+import uuid
 
 from config import settings
 
 
-# For Neon + serverless (Render), use NullPool to avoid connection pooling issues
-# Each request gets a fresh connection - more reliable for serverless
-# Neon handles SSL via sslmode=require in the connection string
+# Built once per process: loading the trust store and initialising OpenSSL
+# isn't free. Certificates are verified against the provider's CA bundle when
+# configured (e.g. Supabase's root certificate), otherwise certifi's.
+SSL_CONTEXT = ssl.create_default_context(cafile=settings.db_ssl_ca_file or certifi.where())
+
+
+def async_database_url(url: str) -> URL:
+    """Parse a database URL, making sure it uses the asyncpg driver.
+
+    Providers hand out plain "postgres://" / "postgresql://" URLs, which would
+    otherwise select a blocking DBAPI (psycopg2) under the async engine.
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ("postgres", "postgresql"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
+
+def is_transaction_pooler(url: URL) -> bool:
+    """Detect a PgBouncer transaction-mode endpoint (Neon "-pooler" host, Supabase port 6543)."""
+    return "-pooler." in (url.host or "") or url.port == 6543
+
+
+database_url = async_database_url(settings.database_url_pooled or settings.database_url)
+
+connect_args = {
+    "timeout": 60,  # Connection timeout (default is 10s, too short for cold starts)
+    "command_timeout": 60,  # Query timeout
+}
+
+# ssl/sslmode in the URL are handled here instead of being passed through:
+# asyncpg has no sslmode argument, and ssl=require would encrypt without
+# verifying the certificate. Only an explicit disable opts out of SSL_CONTEXT
+# (e.g. a plain-text database on a docker network); with no setting, loopback
+# keeps asyncpg's default since local installs rarely have TLS.
+ssl_mode = database_url.query.get("ssl") or database_url.query.get("sslmode")
+database_url = database_url.difference_update_query(["ssl", "sslmode"])
+if ssl_mode == "disable":
+    connect_args["ssl"] = "disable"
+elif ssl_mode is not None or database_url.host not in (None, "localhost", "127.0.0.1"):
+    connect_args["ssl"] = SSL_CONTEXT
+
+if settings.database_url_pooled or is_transaction_pooler(database_url):
+    # PgBouncer multiplexes onto a few server backends, so it is the pool and we
+    # don't keep one of our own. Transaction pooling can't track server-side
+    # prepared statements, so disable asyncpg's caches and give each statement
+    # a unique name to avoid "prepared statement already exists" errors.
+    pool_args = {"poolclass": NullPool}
+    connect_args.update(
+        statement_cache_size=0,
+        prepared_statement_cache_size=0,
+        prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+    )
+else:
+    # Direct endpoint: keep a persistent connection pool on the module-level
+    # engine so warm connections are reused across requests instead of paying
+    # the full TCP + TLS + asyncpg startup handshake every time.
+    pool_args = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,  # Recycle before the provider drops idle connections
+        "pool_pre_ping": True,  # Detect connections dropped while the host was asleep
+    }
+
 engine = create_async_engine(
-    settings.database_url,
+    database_url,
     echo=False,  # Set to True for SQL debugging
-    poolclass=NullPool,  # No connection pooling - better for serverless
-    connect_args={
-        "timeout": 60,  # Connection timeout (default is 10s, too short for cold starts)
-        "command_timeout": 60,  # Query timeout
-        # Note: SSL is handled by sslmode=require in the DATABASE_URL
-        # Neon doesn't need a custom SSL context like Supabase
-    },
+    query_cache_size=1200,  # Keep compiled forms of hot-path statements cached
+    connect_args=connect_args,
+    **pool_args,
 )
 
-AsyncSessionLocal = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 Base = declarative_base()
 
 
+def utc_now():
+    """SQL expression for the current time in UTC, as a naive timestamp.
+
+    Timestamp columns are `timestamp without time zone` holding UTC; a bare
+    now() would be cast to the database session's TimeZone instead. Used for
+    the column defaults and for timestamps the routes set in UPDATEs, so
+    they're all stamped by Postgres on the same clock.
+    """
+    return func.timezone("utc", func.now())
+
+
 async def get_db():
+    # The context manager closes the session on exit
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
\ No newline at end of file
+        yield session
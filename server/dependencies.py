@@ -2,7 +2,7 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, bindparam
 
 from database import get_db
 from models.user import User
@@ -10,6 +10,9 @@ from services.auth import verify_token
 
 security = HTTPBearer(auto_error=False)
 
+# Built once at import; executed with a bound user_id on every request
+SELECT_USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+
 
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
@@ -31,7 +34,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(SELECT_USER_BY_ID, {"user_id": user_id})
     user = result.scalar_one_or_none()
 
     if not user:
@@ -56,5 +59,5 @@ async def get_current_user_optional(
     if not user_id:
         return None
 
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(SELECT_USER_BY_ID, {"user_id": user_id})
     return result.scalar_one_or_none()
@@ -1,8 +1,12 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 import logging
 
+from config import settings
+from database import engine
+from services.auth import close_http_client
 from websocket.yjs_server import websocket_server, router as ws_router
 from routes.auth import router as auth_router
 from routes.boards import router as boards_router
@@ -14,20 +18,44 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def warm_up(app: FastAPI):
+    """Pay one-off startup costs before the first request arrives."""
+    # Open a pooled connection so the first request skips the TCP/TLS handshake
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Database warmup failed: {e}")
+
+    # The OpenAPI schema is otherwise generated on the first docs request
+    if app.openapi_url:
+        app.openapi()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup/shutdown."""
     logger.info("Starting CollabCanvas API...")
+
+    await warm_up(app)
     
     # Use WebsocketServer as async context manager
     async with websocket_server:
         logger.info("Yjs WebSocket server started")
         yield
     
+    await close_http_client()
     logger.info("CollabCanvas API shut down")
 
 
-app = FastAPI(title="CollabCanvas API", lifespan=lifespan, redirect_slashes=False)
+# Skip building the OpenAPI schema (and serving docs) in production
+docs_kwargs = (
+    {"openapi_url": None, "docs_url": None, "redoc_url": None}
+    if settings.env == "prod"
+    else {}
+)
+
+app = FastAPI(title="CollabCanvas API", lifespan=lifespan, redirect_slashes=False, **docs_kwargs)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,14 +66,16 @@ app.add_middleware(
         "https://collabcanvas-tau.vercel.app",
     ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Only what the client actually sends, so preflights don't reflect arbitrary headers
+    allow_methods=["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "db_pool": engine.pool.status()}
 
 
 @app.get("/api/health")
@@ -9,7 +9,7 @@ from alembic import context
 
 # Import our models and config
 from config import settings
-from database import Base
+from database import Base, async_database_url
 from models import User, Board, BoardMember, Comment, CommentMention, BoardInvite
 
 # this is the Alembic Config object, which provides
@@ -64,7 +64,7 @@ async def run_async_migrations() -> None:
     """
     # Create engine directly from settings, bypassing configparser
     connectable = create_async_engine(
-        settings.database_url,
+        async_database_url(settings.database_url),
         poolclass=pool.NullPool,
     )
 
@@ -0,0 +1,34 @@
+"""server side uuid primary keys
+
+Revision ID: 1c45fd708d82
+Revises: 9cc0ae28fe9c
+Create Date: 2026-10-15 09:58:22.640915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c45fd708d82'
+down_revision: Union[str, Sequence[str], None] = '9cc0ae28fe9c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UUID_TABLES = ['users', 'boards', 'board_invites', 'comments']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # gen_random_uuid() is built in from PostgreSQL 13; pgcrypto provides it before that
+    op.execute('CREATE EXTENSION IF NOT EXISTS pgcrypto')
+    for table in UUID_TABLES:
+        op.alter_column(table, 'id', server_default=sa.text('gen_random_uuid()'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in UUID_TABLES:
+        op.alter_column(table, 'id', server_default=None)
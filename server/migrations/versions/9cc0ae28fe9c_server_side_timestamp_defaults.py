@@ -0,0 +1,43 @@
+"""server side timestamp defaults
+
+Revision ID: 9cc0ae28fe9c
+Revises: 70a6c810a1ab
+Create Date: 2026-10-15 09:31:07.128446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9cc0ae28fe9c'
+down_revision: Union[str, Sequence[str], None] = '70a6c810a1ab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = [
+    ('users', 'created_at'),
+    ('users', 'last_active_at'),
+    ('boards', 'created_at'),
+    ('boards', 'updated_at'),
+    ('board_members', 'invited_at'),
+    ('board_invites', 'created_at'),
+    ('comments', 'created_at'),
+    ('comments', 'updated_at'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Columns are timestamp without time zone holding UTC, so convert now()
+    # explicitly rather than letting it take the session's TimeZone
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=sa.text("timezone('utc', now())"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=None)
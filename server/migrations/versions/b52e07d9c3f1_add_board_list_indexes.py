@@ -0,0 +1,35 @@
+"""add board list indexes
+
+Revision ID: b52e07d9c3f1
+Revises: 1c45fd708d82
+Create Date: 2026-10-15 14:03:27.918452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b52e07d9c3f1'
+down_revision: Union[str, Sequence[str], None] = '1c45fd708d82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_boards_owner_id_active',
+        'boards',
+        ['owner_id'],
+        postgresql_where=sa.text('deleted_at IS NULL'),
+    )
+    op.create_index('ix_board_members_user_id_board_id', 'board_members', ['user_id', 'board_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_board_members_user_id_board_id', table_name='board_members')
+    op.drop_index('ix_boards_owner_id_active', table_name='boards')
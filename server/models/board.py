@@ -1,23 +1,25 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index, exists, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
-from database import Base
+from database import Base, utc_now
 
 
 class Board(Base):
     __tablename__ = "boards"
+    __table_args__ = (
+        # Backs the "boards I own" branch of the board list
+        Index("ix_boards_owner_id_active", "owner_id", postgresql_where=text("deleted_at IS NULL")),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     name = Column(String(255), nullable=False, default="Untitled")
     owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     thumbnail_url = Column(String)
     is_public = Column(Boolean, default=False)
     deleted_at = Column(DateTime)  # Soft delete
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
 
     # Relationships
     owner = relationship("User", back_populates="owned_boards")
@@ -26,12 +28,29 @@ class Board(Base):
 
 class BoardMember(Base):
     __tablename__ = "board_members"
+    __table_args__ = (
+        # The primary key leads with board_id; this serves lookups by user
+        Index("ix_board_members_user_id_board_id", "user_id", "board_id"),
+    )
 
     board_id = Column(UUID(as_uuid=True), ForeignKey("boards.id"), primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
     role = Column(String(20), nullable=False, default="editor")  # 'owner', 'editor', 'viewer'
-    invited_at = Column(DateTime, default=datetime.utcnow)
+    invited_at = Column(DateTime, server_default=utc_now())
 
     # Relationships
     board = relationship("Board", back_populates="members")
     user = relationship("User", back_populates="board_memberships")
+
+
+def is_board_member(user_id):
+    """Labelled EXISTS that is true when user_id is a member of the selected Board.
+
+    Lets access checks answer membership in SQL instead of loading every
+    member row.
+    """
+    return (
+        exists()
+        .where(BoardMember.board_id == Board.id, BoardMember.user_id == user_id)
+        .label("is_member")
+    )
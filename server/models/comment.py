@@ -1,16 +1,14 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Float, Text
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Float, Text, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
-from database import Base
+from database import Base, utc_now
 
 
 class Comment(Base):
     __tablename__ = "comments"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     board_id = Column(UUID(as_uuid=True), ForeignKey("boards.id"), nullable=False)
     parent_id = Column(UUID(as_uuid=True), ForeignKey("comments.id"), nullable=True)
     author_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -20,8 +18,8 @@ class Comment(Base):
     resolved = Column(Boolean, default=False)
     resolved_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     resolved_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
 
     # Relationships
     author = relationship("User", foreign_keys=[author_id])
@@ -1,23 +1,21 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
-from database import Base
+from database import Base, utc_now
 
 
 class BoardInvite(Base):
     __tablename__ = "board_invites"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     board_id = Column(UUID(as_uuid=True), ForeignKey("boards.id"), nullable=False)
     role = Column(String(20), nullable=False, default="editor")  # 'editor' or 'viewer'
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     expires_at = Column(DateTime, nullable=True)
     max_uses = Column(Integer, nullable=True)
     use_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
 
     # Relationships
     board = relationship("Board")
@@ -1,24 +1,26 @@
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-import uuid
-from datetime import datetime
 
-from database import Base
+from database import Base, utc_now
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Backs the OAuth login lookup by (provider, provider_id)
+        UniqueConstraint("provider", "provider_id", name="uq_user_provider"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     email = Column(String(255), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False)
     avatar_url = Column(String)
     provider = Column(String(20), nullable=False)  # 'google' or 'github'
     provider_id = Column(String(255), nullable=False)
     cursor_color = Column(String(7), nullable=False)  # Hex color like #FF6B6B
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_active_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=utc_now())
+    last_active_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now())
 
     # Relationships
     owned_boards = relationship("Board", back_populates="owner", cascade="all, delete-orphan")
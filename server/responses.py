@@ -0,0 +1,14 @@
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class PydanticResponse(JSONResponse):
+    """JSON response rendered straight from a Pydantic model.
+
+    Pair with Model.model_construct() for data we built ourselves from the
+    database: nothing is validated twice and FastAPI's jsonable_encoder pass
+    is skipped.
+    """
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.model_dump_json().encode()
@@ -1,17 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import select, insert, or_, and_, case, bindparam
+from sqlalchemy.exc import DBAPIError
 from pydantic import BaseModel
 import random
+import secrets
 import asyncio
 import logging
 
 from config import settings
 from database import get_db
 from models.user import User
-from dependencies import get_current_user
+from dependencies import get_current_user, SELECT_USER_BY_ID
 from services.auth import (
     create_access_token,
     create_refresh_token,
@@ -26,12 +27,17 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+# Settings are fixed after startup, so build the OAuth URLs once
+GOOGLE_REDIRECT_URI = f"{settings.backend_url}/api/auth/google/callback"
+GITHUB_REDIRECT_URI = f"{settings.backend_url}/api/auth/github/callback"
+FRONTEND_CALLBACK_URL = f"{settings.frontend_url}/auth/callback"
+
 # Cursor colors for new users
-CURSOR_COLORS = [
+CURSOR_COLORS = (
     "#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4",
     "#FFEAA7", "#DDA0DD", "#98D8C8", "#F7DC6F",
     "#BB8FCE", "#85C1E9", "#F8B500", "#00CED1",
-]
+)
 
 
 class TokenResponse(BaseModel):
@@ -55,38 +61,60 @@ class RefreshRequest(BaseModel):
     refresh_token: str
 
 
-async def execute_with_retry(db: AsyncSession, query, max_retries: int = 3):
+# Backoff between attempts; short enough not to stall the OAuth redirect
+DB_RETRY_DELAYS = (0.05, 0.15, 0.3)
+# Postgres admin shutdown / cannot connect now (e.g. Neon waking up)
+TRANSIENT_SQLSTATES = ("57P01", "57P03")
+
+
+def is_transient_db_error(error: DBAPIError) -> bool:
+    """Check whether a database error is a dropped or unavailable connection."""
+    if error.connection_invalidated:
+        return True
+    # asyncpg errors arrive wrapped by the SQLAlchemy adapter; the SQLSTATE is
+    # copied onto the adapted error and also set on the asyncpg original
+    sqlstate = (
+        getattr(error.orig, "sqlstate", None)
+        or getattr(error.orig.__cause__, "sqlstate", None)
+        or ""
+    )
+    # Class 08 is connection exceptions
+    return sqlstate.startswith("08") or sqlstate in TRANSIENT_SQLSTATES
+
+
+async def execute_with_retry(db: AsyncSession, query, params: dict | None = None):
     """Execute a database query with retry logic for cold starts."""
-    last_error = None
-    for attempt in range(max_retries):
+    for attempt in range(len(DB_RETRY_DELAYS) + 1):
         try:
-            result = await db.execute(query)
-            return result
-        except OperationalError as e:
-            last_error = e
-            logger.warning(f"Database connection attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                # Wait with exponential backoff
-                await asyncio.sleep(2 ** attempt)
-                # Try to rollback any failed transaction
-                try:
-                    await db.rollback()
-                except Exception:
-                    pass
-            else:
+            return await db.execute(query, params)
+        except DBAPIError as e:
+            if attempt == len(DB_RETRY_DELAYS) or not is_transient_db_error(e):
                 raise
-        except Exception as e:
-            # For other errors, don't retry
-            raise
-    raise last_error
+            logger.warning(f"Database connection attempt {attempt + 1} failed: {e}")
+            # Reset the failed transaction, then wait with jittered backoff
+            await db.rollback()
+            await asyncio.sleep(DB_RETRY_DELAYS[attempt] + random.random() * 0.05)
+
+
+# Hot-path statements are built once at import and executed with bound params
+_is_provider_match = and_(
+    User.provider == bindparam("provider"),
+    User.provider_id == bindparam("provider_id"),
+)
+# Find a user by provider id or, failing that, by email in one query
+SELECT_OAUTH_USER = (
+    select(User)
+    .where(or_(_is_provider_match, User.email == bindparam("email")))
+    .order_by(case((_is_provider_match, 0), else_=1))
+    .limit(1)
+)
 
 
 # Google OAuth
 @router.get("/google")
 async def google_login(redirect: bool = False):
     """Get Google OAuth URL or redirect to it."""
-    redirect_uri = f"{settings.backend_url}/api/auth/google/callback"
-    url = await get_google_auth_url(redirect_uri)
+    url = await get_google_auth_url(GOOGLE_REDIRECT_URI)
     if redirect:
         return RedirectResponse(url=url, status_code=302)
     return {"url": url}
@@ -95,10 +123,8 @@ async def google_login(redirect: bool = False):
 @router.get("/google/callback")
 async def google_callback(code: str, db: AsyncSession = Depends(get_db)):
     """Handle Google OAuth callback."""
-    redirect_uri = f"{settings.backend_url}/api/auth/google/callback"
-
     try:
-        google_user = await get_google_user(code, redirect_uri)
+        google_user = await get_google_user(code, GOOGLE_REDIRECT_URI)
     except Exception as e:
         logger.error(f"Google OAuth failed: {e}")
         raise HTTPException(
@@ -107,39 +133,37 @@ async def google_callback(code: str, db: AsyncSession = Depends(get_db)):
         )
 
     try:
-        # Find user by provider_id first, then by email
+        # Find user by provider_id first, then by email (might have signed up
+        # with a different provider)
         result = await execute_with_retry(
             db,
-            select(User).where(
-                User.provider == "google",
-                User.provider_id == str(google_user["id"]),
-            )
+            SELECT_OAUTH_USER,
+            {"provider": "google", "provider_id": str(google_user["id"]), "email": google_user["email"]},
         )
         user = result.scalar_one_or_none()
 
-        if not user:
-            # Check if user exists with same email (might have signed up with different provider)
-            result = await execute_with_retry(
-                db,
-                select(User).where(User.email == google_user["email"])
+        if user:
+            user_id = user.id
+        else:
+            # Create new user; the id comes back from the INSERT itself
+            result = await db.execute(
+                insert(User)
+                .values(
+                    email=google_user["email"],
+                    name=google_user.get("name", google_user["email"].split("@")[0]),
+                    avatar_url=google_user.get("picture"),
+                    provider="google",
+                    provider_id=str(google_user["id"]),
+                    cursor_color=CURSOR_COLORS[secrets.randbelow(len(CURSOR_COLORS))],
+                )
+                .returning(User.id)
             )
-            user = result.scalar_one_or_none()
-
-        if not user:
-            # Create new user
-            user = User(
-                email=google_user["email"],
-                name=google_user.get("name", google_user["email"].split("@")[0]),
-                avatar_url=google_user.get("picture"),
-                provider="google",
-                provider_id=str(google_user["id"]),
-                cursor_color=random.choice(CURSOR_COLORS),
-            )
-            db.add(user)
+            user_id = result.scalar_one()
             await db.commit()
-            await db.refresh(user)
 
-    except OperationalError as e:
+    except DBAPIError as e:
+        if not is_transient_db_error(e):
+            raise
         logger.error(f"Database error during Google OAuth: {e}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -147,13 +171,12 @@ async def google_callback(code: str, db: AsyncSession = Depends(get_db)):
         )
 
     # Create tokens
-    access_token = create_access_token(str(user.id))
-    refresh_token = create_refresh_token(str(user.id))
+    access_token = create_access_token(str(user_id))
+    refresh_token = create_refresh_token(str(user_id))
 
     # Redirect to frontend with tokens
-    frontend_callback = f"{settings.frontend_url}/auth/callback"
     return RedirectResponse(
-        url=f"{frontend_callback}?access_token={access_token}&refresh_token={refresh_token}"
+        url=f"{FRONTEND_CALLBACK_URL}?access_token={access_token}&refresh_token={refresh_token}"
     )
 
 
@@ -161,8 +184,7 @@ async def google_callback(code: str, db: AsyncSession = Depends(get_db)):
 @router.get("/github")
 async def github_login(redirect: bool = False):
     """Get GitHub OAuth URL or redirect to it."""
-    redirect_uri = f"{settings.backend_url}/api/auth/github/callback"
-    url = await get_github_auth_url(redirect_uri)
+    url = await get_github_auth_url(GITHUB_REDIRECT_URI)
     if redirect:
         return RedirectResponse(url=url, status_code=302)
     return {"url": url}
@@ -171,10 +193,8 @@ async def github_login(redirect: bool = False):
 @router.get("/github/callback")
 async def github_callback(code: str, state: str = None, db: AsyncSession = Depends(get_db)):
     """Handle GitHub OAuth callback."""
-    redirect_uri = f"{settings.backend_url}/api/auth/github/callback"
-
     try:
-        github_user = await get_github_user(code, redirect_uri)
+        github_user = await get_github_user(code, GITHUB_REDIRECT_URI)
     except Exception as e:
         logger.error(f"GitHub OAuth failed: {e}")
         raise HTTPException(
@@ -189,39 +209,37 @@ async def github_callback(code: str, state: str = None, db: AsyncSession = Depen
         )
 
     try:
-        # Find user by provider_id first, then by email
+        # Find user by provider_id first, then by email (might have signed up
+        # with a different provider)
         result = await execute_with_retry(
             db,
-            select(User).where(
-                User.provider == "github",
-                User.provider_id == str(github_user["id"]),
-            )
+            SELECT_OAUTH_USER,
+            {"provider": "github", "provider_id": str(github_user["id"]), "email": github_user["email"]},
         )
         user = result.scalar_one_or_none()
 
-        if not user:
-            # Check if user exists with same email (might have signed up with different provider)
-            result = await execute_with_retry(
-                db,
-                select(User).where(User.email == github_user["email"])
-            )
-            user = result.scalar_one_or_none()
-
-        if not user:
-            # Create new user
-            user = User(
-                email=github_user["email"],
-                name=github_user.get("name") or github_user.get("login", "User"),
-                avatar_url=github_user.get("avatar_url"),
-                provider="github",
-                provider_id=str(github_user["id"]),
-                cursor_color=random.choice(CURSOR_COLORS),
+        if user:
+            user_id = user.id
+        else:
+            # Create new user; the id comes back from the INSERT itself
+            result = await db.execute(
+                insert(User)
+                .values(
+                    email=github_user["email"],
+                    name=github_user.get("name") or github_user.get("login", "User"),
+                    avatar_url=github_user.get("avatar_url"),
+                    provider="github",
+                    provider_id=str(github_user["id"]),
+                    cursor_color=CURSOR_COLORS[secrets.randbelow(len(CURSOR_COLORS))],
+                )
+                .returning(User.id)
             )
-            db.add(user)
+            user_id = result.scalar_one()
             await db.commit()
-            await db.refresh(user)
 
-    except OperationalError as e:
+    except DBAPIError as e:
+        if not is_transient_db_error(e):
+            raise
         logger.error(f"Database error during GitHub OAuth: {e}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -229,13 +247,12 @@ async def github_callback(code: str, state: str = None, db: AsyncSession = Depen
         )
 
     # Create tokens
-    access_token = create_access_token(str(user.id))
-    refresh_token = create_refresh_token(str(user.id))
+    access_token = create_access_token(str(user_id))
+    refresh_token = create_refresh_token(str(user_id))
 
     # Redirect to frontend with tokens
-    frontend_callback = f"{settings.frontend_url}/auth/callback"
     return RedirectResponse(
-        url=f"{frontend_callback}?access_token={access_token}&refresh_token={refresh_token}"
+        url=f"{FRONTEND_CALLBACK_URL}?access_token={access_token}&refresh_token={refresh_token}"
     )
 
 
@@ -264,9 +281,11 @@ async def refresh_tokens(request: RefreshRequest, db: AsyncSession = Depends(get
 
     try:
         # Verify user still exists
-        result = await execute_with_retry(db, select(User).where(User.id == user_id))
+        result = await execute_with_retry(db, SELECT_USER_BY_ID, {"user_id": user_id})
         user = result.scalar_one_or_none()
-    except OperationalError:
+    except DBAPIError as e:
+        if not is_transient_db_error(e):
+            raise
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Database temporarily unavailable. Please try again.",
@@ -286,7 +305,7 @@ async def refresh_tokens(request: RefreshRequest, db: AsyncSession = Depends(get
 
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout():
     """Logout the current user (client should clear tokens)."""
     # For stateless JWT, we just return success
     # Client is responsible for clearing tokens
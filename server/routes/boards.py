@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, update, union, literal
+from sqlalchemy.orm import selectinload, raiseload
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
 import uuid
 
-from database import get_db
+from database import get_db, utc_now
 from models.user import User
-from models.board import Board, BoardMember
+from models.board import Board, BoardMember, is_board_member
 from dependencies import get_current_user
+from responses import PydanticResponse
 
 router = APIRouter(prefix="/api/boards", tags=["boards"])
 
@@ -59,21 +61,26 @@ async def get_board_with_access(
     user: User,
     db: AsyncSession,
     require_owner: bool = False,
+    load_members: bool = False,
 ) -> Board:
     """Get board if user has access, raise 404/403 otherwise."""
-    result = await db.execute(
-        select(Board)
-        .options(selectinload(Board.members).selectinload(BoardMember.user))
-        .where(Board.id == board_id, Board.deleted_at.is_(None))
-    )
-    board = result.scalar_one_or_none()
+    is_member = is_board_member(user.id)
+    query = select(Board, is_member).where(Board.id == board_id, Board.deleted_at.is_(None))
+    if load_members:
+        query = query.options(
+            selectinload(Board.members).selectinload(BoardMember.user),
+            raiseload("*"),
+        )
+
+    result = await db.execute(query)
+    row = result.one_or_none()
 
-    if not board:
+    if not row:
         raise HTTPException(status_code=404, detail="Board not found")
 
     # Check access
+    board, is_member = row
     is_owner = board.owner_id == user.id
-    is_member = any(m.user_id == user.id for m in board.members)
 
     if require_owner and not is_owner:
         raise HTTPException(status_code=403, detail="Only the owner can perform this action")
@@ -84,40 +91,68 @@ async def get_board_with_access(
     return board
 
 
-@router.get("", response_model=list[BoardResponse])
+def insert_board_with_owner(owner_id: uuid.UUID, **values):
+    """Build a statement creating a board plus its owner membership.
+
+    Both INSERTs run as data-modifying CTEs, so this is a single round trip;
+    the statement returns the new board row.
+    """
+    new_board = (
+        insert(Board)
+        .values(owner_id=owner_id, **values)
+        .returning(*Board.__table__.c)
+        .cte("new_board")
+    )
+    add_owner = (
+        insert(BoardMember)
+        .from_select(
+            ["board_id", "user_id", "role"],
+            select(new_board.c.id, literal(owner_id, BoardMember.user_id.type), literal("owner")),
+        )
+        .cte("add_owner")
+    )
+    return select(new_board).add_cte(add_owner)
+
+
+@router.get("", response_model=list[BoardResponse], response_class=ORJSONResponse)
 async def list_boards(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """List all boards the user owns or is a member of."""
-    # Get boards where user is owner or member
-    result = await db.execute(
-        select(Board)
-        .outerjoin(BoardMember, Board.id == BoardMember.board_id)
-        .where(
-            Board.deleted_at.is_(None),
-            or_(
-                Board.owner_id == user.id,
-                BoardMember.user_id == user.id,
-            ),
-        )
-        .distinct()
-        .order_by(Board.updated_at.desc())
+    # Only the response columns are selected, so rows come back as plain
+    # tuples without building ORM objects
+    columns = (
+        Board.id,
+        Board.name,
+        Board.owner_id,
+        Board.thumbnail_url,
+        Board.is_public,
+        Board.created_at,
+        Board.updated_at,
     )
-    boards = result.scalars().all()
-
-    return [
-        BoardResponse(
-            id=str(board.id),
-            name=board.name,
-            owner_id=str(board.owner_id),
-            thumbnail_url=board.thumbnail_url,
-            is_public=board.is_public,
-            created_at=board.created_at,
-            updated_at=board.updated_at,
-        )
-        for board in boards
-    ]
+    # Owned and member boards as two indexed branches; UNION drops the overlap
+    # (owners are members too) without an OUTER JOIN + DISTINCT over both
+    owned = select(*columns).where(Board.owner_id == user.id, Board.deleted_at.is_(None))
+    member = (
+        select(*columns)
+        .join(BoardMember, Board.id == BoardMember.board_id)
+        .where(BoardMember.user_id == user.id, Board.deleted_at.is_(None))
+    )
+    result = await db.execute(union(owned, member).order_by(Board.updated_at.desc()))
+
+    return ORJSONResponse([
+        {
+            "id": str(row.id),
+            "name": row.name,
+            "owner_id": str(row.owner_id),
+            "thumbnail_url": row.thumbnail_url,
+            "is_public": row.is_public,
+            "created_at": row.created_at,
+            "updated_at": row.updated_at,
+        }
+        for row in result
+    ])
 
 
 @router.post("", response_model=BoardResponse, status_code=status.HTTP_201_CREATED)
@@ -127,32 +162,21 @@ async def create_board(
     db: AsyncSession = Depends(get_db),
 ):
     """Create a new board."""
-    board = Board(
-        name=data.name,
-        owner_id=user.id,
-    )
-    db.add(board)
-    await db.flush()  # Flush to get the board ID
-
-    # Add owner as a member with 'owner' role
-    member = BoardMember(
-        board_id=board.id,
-        user_id=user.id,
-        role="owner",
-    )
-    db.add(member)
-
+    result = await db.execute(insert_board_with_owner(user.id, name=data.name))
+    board = result.one()
     await db.commit()
-    await db.refresh(board)
-
-    return BoardResponse(
-        id=str(board.id),
-        name=board.name,
-        owner_id=str(board.owner_id),
-        thumbnail_url=board.thumbnail_url,
-        is_public=board.is_public,
-        created_at=board.created_at,
-        updated_at=board.updated_at,
+
+    return PydanticResponse(
+        BoardResponse.model_construct(
+            id=str(board.id),
+            name=board.name,
+            owner_id=str(board.owner_id),
+            thumbnail_url=board.thumbnail_url,
+            is_public=board.is_public,
+            created_at=board.created_at,
+            updated_at=board.updated_at,
+        ),
+        status_code=status.HTTP_201_CREATED,
     )
 
 
@@ -163,10 +187,10 @@ async def get_board(
     db: AsyncSession = Depends(get_db),
 ):
     """Get board details."""
-    board = await get_board_with_access(board_id, user, db)
+    board = await get_board_with_access(board_id, user, db, load_members=True)
 
     members = [
-        BoardMemberResponse(
+        BoardMemberResponse.model_construct(
             user_id=str(m.user_id),
             name=m.user.name,
             email=m.user.email,
@@ -176,15 +200,17 @@ async def get_board(
         for m in board.members
     ]
 
-    return BoardDetailResponse(
-        id=str(board.id),
-        name=board.name,
-        owner_id=str(board.owner_id),
-        thumbnail_url=board.thumbnail_url,
-        is_public=board.is_public,
-        created_at=board.created_at,
-        updated_at=board.updated_at,
-        members=members,
+    return PydanticResponse(
+        BoardDetailResponse.model_construct(
+            id=str(board.id),
+            name=board.name,
+            owner_id=str(board.owner_id),
+            thumbnail_url=board.thumbnail_url,
+            is_public=board.is_public,
+            created_at=board.created_at,
+            updated_at=board.updated_at,
+            members=members,
+        ),
     )
 
 
@@ -198,23 +224,31 @@ async def update_board(
     """Update board name or visibility."""
     board = await get_board_with_access(board_id, user, db, require_owner=True)
 
+    values = {"updated_at": utc_now()}
     if data.name is not None:
-        board.name = data.name
+        values["name"] = data.name
     if data.is_public is not None:
-        board.is_public = data.is_public
+        values["is_public"] = data.is_public
 
-    board.updated_at = datetime.utcnow()
+    result = await db.execute(
+        update(Board)
+        .where(Board.id == board.id)
+        .values(**values)
+        .returning(Board)
+    )
+    board = result.scalar_one()
     await db.commit()
-    await db.refresh(board)
-
-    return BoardResponse(
-        id=str(board.id),
-        name=board.name,
-        owner_id=str(board.owner_id),
-        thumbnail_url=board.thumbnail_url,
-        is_public=board.is_public,
-        created_at=board.created_at,
-        updated_at=board.updated_at,
+
+    return PydanticResponse(
+        BoardResponse.model_construct(
+            id=str(board.id),
+            name=board.name,
+            owner_id=str(board.owner_id),
+            thumbnail_url=board.thumbnail_url,
+            is_public=board.is_public,
+            created_at=board.created_at,
+            updated_at=board.updated_at,
+        ),
     )
 
 
@@ -227,7 +261,7 @@ async def delete_board(
     """Soft delete a board."""
     board = await get_board_with_access(board_id, user, db, require_owner=True)
 
-    board.deleted_at = datetime.utcnow()
+    await db.execute(update(Board).where(Board.id == board.id).values(deleted_at=utc_now()))
     await db.commit()
 
 
@@ -241,34 +275,28 @@ async def duplicate_board(
     original = await get_board_with_access(board_id, user, db)
 
     # Create new board
-    new_board = Board(
-        name=f"{original.name} (Copy)",
-        owner_id=user.id,
-        is_public=False,  # Duplicates are private by default
-    )
-    db.add(new_board)
-    await db.flush()  # Flush to get the board ID
-
-    # Add owner as member
-    member = BoardMember(
-        board_id=new_board.id,
-        user_id=user.id,
-        role="owner",
+    result = await db.execute(
+        insert_board_with_owner(
+            user.id,
+            name=f"{original.name} (Copy)",
+            is_public=False,  # Duplicates are private by default
+        )
     )
-    db.add(member)
-
+    new_board = result.one()
     await db.commit()
-    await db.refresh(new_board)
 
     # Note: In a full implementation, we would also copy the Yjs document data
     # This would require fetching from the Yjs server and creating a new room
 
-    return BoardResponse(
-        id=str(new_board.id),
-        name=new_board.name,
-        owner_id=str(new_board.owner_id),
-        thumbnail_url=new_board.thumbnail_url,
-        is_public=new_board.is_public,
-        created_at=new_board.created_at,
-        updated_at=new_board.updated_at,
+    return PydanticResponse(
+        BoardResponse.model_construct(
+            id=str(new_board.id),
+            name=new_board.name,
+            owner_id=str(new_board.owner_id),
+            thumbnail_url=new_board.thumbnail_url,
+            is_public=new_board.is_public,
+            created_at=new_board.created_at,
+            updated_at=new_board.updated_at,
+        ),
+        status_code=status.HTTP_201_CREATED,
     )
@@ -1,20 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, update, or_
+from sqlalchemy.orm import selectinload, raiseload
+from sqlalchemy.orm.attributes import set_committed_value
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
 import re
 
-from database import get_db
+from database import get_db, utc_now
 from models.user import User
-from models.board import Board, BoardMember
+from models.board import Board, BoardMember, is_board_member
 from models.comment import Comment, CommentMention
 from dependencies import get_current_user
+from responses import PydanticResponse
 
 router = APIRouter(prefix="/api/boards", tags=["comments"])
 
+# Match @username patterns
+MENTION_PATTERN = re.compile(r'@(\w+)')
+
 
 # Pydantic models
 class CommentCreate(BaseModel):
@@ -60,18 +66,17 @@ class CommentResponse(BaseModel):
 
 # Helper to check board access
 async def get_board_with_access(board_id: str, user: User, db: AsyncSession) -> Board:
+    is_member = is_board_member(user.id)
     result = await db.execute(
-        select(Board)
-        .options(selectinload(Board.members))
-        .where(Board.id == board_id, Board.deleted_at.is_(None))
+        select(Board, is_member).where(Board.id == board_id, Board.deleted_at.is_(None))
     )
-    board = result.scalar_one_or_none()
+    row = result.one_or_none()
 
-    if not board:
+    if not row:
         raise HTTPException(status_code=404, detail="Board not found")
 
+    board, is_member = row
     is_owner = board.owner_id == user.id
-    is_member = any(m.user_id == user.id for m in board.members)
 
     if not is_owner and not is_member and not board.is_public:
         raise HTTPException(status_code=403, detail="You don't have access to this board")
@@ -81,17 +86,18 @@ async def get_board_with_access(board_id: str, user: User, db: AsyncSession) ->
 
 def extract_mentions(content: str) -> list[str]:
     """Extract @mentions from content."""
-    # Match @username patterns
-    pattern = r'@(\w+)'
-    return re.findall(pattern, content)
+    return MENTION_PATTERN.findall(content)
 
 
-def build_comment_response(comment: Comment) -> CommentResponse:
-    return CommentResponse(
+def build_comment_response(
+    comment: Comment, replies: Optional[list[CommentResponse]] = None
+) -> CommentResponse:
+    """Build the response for a single comment; callers attach its replies."""
+    return CommentResponse.model_construct(
         id=str(comment.id),
         board_id=str(comment.board_id),
         parent_id=str(comment.parent_id) if comment.parent_id else None,
-        author=AuthorResponse(
+        author=AuthorResponse.model_construct(
             id=str(comment.author.id),
             name=comment.author.name,
             avatar_url=comment.author.avatar_url,
@@ -104,12 +110,12 @@ def build_comment_response(comment: Comment) -> CommentResponse:
         resolved_at=comment.resolved_at,
         created_at=comment.created_at,
         updated_at=comment.updated_at,
-        replies=[build_comment_response(r) for r in comment.replies],
+        replies=replies or [],
         mentions=[str(m.user_id) for m in comment.mentions],
     )
 
 
-@router.get("/{board_id}/comments", response_model=list[CommentResponse])
+@router.get("/{board_id}/comments", response_model=list[CommentResponse], response_class=ORJSONResponse)
 async def list_comments(
     board_id: str,
     user: User = Depends(get_current_user),
@@ -118,20 +124,30 @@ async def list_comments(
     """List all root comments for a board (with nested replies)."""
     await get_board_with_access(board_id, user, db)
 
+    # Fetch the whole board's comments in one query, regardless of nesting depth
     result = await db.execute(
         select(Comment)
         .options(
             selectinload(Comment.author),
             selectinload(Comment.mentions),
-            selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Comment.replies).selectinload(Comment.mentions),
+            raiseload("*"),
         )
-        .where(Comment.board_id == board_id, Comment.parent_id.is_(None))
-        .order_by(Comment.created_at.desc())
+        .where(Comment.board_id == board_id)
+        .order_by(Comment.created_at)
     )
     comments = result.scalars().all()
 
-    return [build_comment_response(c) for c in comments]
+    # Assemble the reply tree in two linear passes instead of recursing
+    responses = {c.id: build_comment_response(c) for c in comments}
+    roots = []
+    for c in comments:
+        if c.parent_id is None:
+            roots.append(responses[c.id])
+        elif c.parent_id in responses:
+            responses[c.parent_id].replies.append(responses[c.id])
+    roots.reverse()  # Newest threads first, replies oldest first
+
+    return ORJSONResponse([r.model_dump() for r in roots])
 
 
 @router.post("/{board_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
@@ -160,43 +176,47 @@ async def create_comment(
         content=data.content,
         position_x=data.position_x if not data.parent_id else None,
         position_y=data.position_y if not data.parent_id else None,
+        # Set explicitly so they're loaded after the INSERT and the response
+        # can be built without a refresh
+        resolved_by=None,
+        resolved_at=None,
     )
     db.add(comment)
     await db.flush()
 
     # Process mentions
+    mentions = []
     mentioned_names = extract_mentions(data.content)
     if mentioned_names:
-        # Find users by name who are members of this board
-        for name in mentioned_names:
-            result = await db.execute(
-                select(User)
-                .join(BoardMember, BoardMember.user_id == User.id)
-                .where(
-                    BoardMember.board_id == board_id,
-                    User.name.ilike(f"%{name}%"),
-                )
+        # Find board members matching any of the names in a single query
+        result = await db.execute(
+            select(User.id, User.name)
+            .join(BoardMember, BoardMember.user_id == User.id)
+            .where(
+                BoardMember.board_id == board_id,
+                or_(*(User.name.icontains(name, autoescape=True) for name in mentioned_names)),
             )
-            mentioned_user = result.scalar_one_or_none()
-            if mentioned_user:
-                mention = CommentMention(comment_id=comment.id, user_id=mentioned_user.id)
-                db.add(mention)
+        )
+        candidates = result.all()
+
+        mentioned_ids = set()
+        for name in mentioned_names:
+            matches = [c.id for c in candidates if name.lower() in c.name.lower()]
+            # Skip ambiguous mentions that match more than one member
+            if len(matches) == 1:
+                mentioned_ids.add(matches[0])
+        mentions = [CommentMention(comment_id=comment.id, user_id=user_id) for user_id in mentioned_ids]
+        db.add_all(mentions)
 
     await db.commit()
 
-    # Reload with relationships
-    result = await db.execute(
-        select(Comment)
-        .options(
-            selectinload(Comment.author),
-            selectinload(Comment.mentions),
-            selectinload(Comment.replies),
-        )
-        .where(Comment.id == comment.id)
-    )
-    comment = result.scalar_one()
+    # Fill in relationships from what we already have instead of reloading:
+    # the author is the current user and a new comment has no replies
+    set_committed_value(comment, "author", user)
+    set_committed_value(comment, "mentions", mentions)
+    set_committed_value(comment, "replies", [])
 
-    return build_comment_response(comment)
+    return PydanticResponse(build_comment_response(comment), status_code=status.HTTP_201_CREATED)
 
 
 @router.patch("/comments/{comment_id}", response_model=CommentResponse)
@@ -214,6 +234,7 @@ async def update_comment(
             selectinload(Comment.mentions),
             selectinload(Comment.replies).selectinload(Comment.author),
             selectinload(Comment.replies).selectinload(Comment.mentions),
+            raiseload("*"),
         )
         .where(Comment.id == comment_id)
     )
@@ -225,40 +246,34 @@ async def update_comment(
     # Check board access
     await get_board_with_access(str(comment.board_id), user, db)
 
+    values = {"updated_at": utc_now()}
+
     # Only author can edit content
     if data.content is not None:
         if comment.author_id != user.id:
             raise HTTPException(status_code=403, detail="Only the author can edit this comment")
-        comment.content = data.content
+        values["content"] = data.content
 
     # Anyone with access can resolve/unresolve
     if data.resolved is not None:
         if data.resolved and not comment.resolved:
-            comment.resolved = True
-            comment.resolved_by = user.id
-            comment.resolved_at = datetime.utcnow()
+            values.update(resolved=True, resolved_by=user.id, resolved_at=utc_now())
         elif not data.resolved and comment.resolved:
-            comment.resolved = False
-            comment.resolved_by = None
-            comment.resolved_at = None
-
-    comment.updated_at = datetime.utcnow()
-    await db.commit()
+            values.update(resolved=False, resolved_by=None, resolved_at=None)
 
-    # Reload with relationships
+    # RETURNING refreshes the loaded comment in place; its relationships stay
+    # valid (only scalar columns changed), so no reload is needed
     result = await db.execute(
-        select(Comment)
-        .options(
-            selectinload(Comment.author),
-            selectinload(Comment.mentions),
-            selectinload(Comment.replies).selectinload(Comment.author),
-            selectinload(Comment.replies).selectinload(Comment.mentions),
-        )
-        .where(Comment.id == comment_id)
+        update(Comment)
+        .where(Comment.id == comment.id)
+        .values(**values)
+        .returning(Comment)
     )
     comment = result.scalar_one()
+    await db.commit()
 
-    return build_comment_response(comment)
+    replies = [build_comment_response(r) for r in comment.replies]
+    return PydanticResponse(build_comment_response(comment, replies))
 
 
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, insert, text
+from sqlalchemy.orm import selectinload, raiseload
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from typing import Optional
 
 from database import get_db
 from models.user import User
-from models.board import Board, BoardMember
+from models.board import Board, BoardMember, is_board_member
 from models.invite import BoardInvite
 from dependencies import get_current_user
+from responses import PydanticResponse
 from config import settings
 
 router = APIRouter(prefix="/api", tags=["sharing"])
@@ -56,9 +57,7 @@ class MemberUpdate(BaseModel):
 # Helper to check owner access
 async def get_board_as_owner(board_id: str, user: User, db: AsyncSession) -> Board:
     result = await db.execute(
-        select(Board)
-        .options(selectinload(Board.members).selectinload(BoardMember.user))
-        .where(Board.id == board_id, Board.deleted_at.is_(None))
+        select(Board).where(Board.id == board_id, Board.deleted_at.is_(None))
     )
     board = result.scalar_one_or_none()
 
@@ -89,28 +88,68 @@ async def create_invite(
     if data.expires_in_days:
         expires_at = datetime.utcnow() + timedelta(days=data.expires_in_days)
 
-    invite = BoardInvite(
-        board_id=board.id,
-        role=data.role,
-        created_by=user.id,
-        expires_at=expires_at,
-        max_uses=data.max_uses,
+    # RETURNING hands back the generated id and server defaults with the insert
+    result = await db.execute(
+        insert(BoardInvite)
+        .values(
+            board_id=board.id,
+            role=data.role,
+            created_by=user.id,
+            expires_at=expires_at,
+            max_uses=data.max_uses,
+        )
+        .returning(BoardInvite)
     )
-    db.add(invite)
+    invite = result.scalar_one()
     await db.commit()
-    await db.refresh(invite)
 
     invite_url = f"{settings.frontend_url}/invite/{invite.id}"
 
-    return InviteResponse(
-        id=str(invite.id),
-        invite_url=invite_url,
-        role=invite.role,
-        expires_at=invite.expires_at,
-        max_uses=invite.max_uses,
-        use_count=invite.use_count,
-        created_at=invite.created_at,
+    return PydanticResponse(
+        InviteResponse.model_construct(
+            id=str(invite.id),
+            invite_url=invite_url,
+            role=invite.role,
+            expires_at=invite.expires_at,
+            max_uses=invite.max_uses,
+            use_count=invite.use_count,
+            created_at=invite.created_at,
+        ),
+        status_code=status.HTTP_201_CREATED,
+    )
+
+
+# Accept an invite in one statement: lock the invite row, add the membership
+# if the invite is still usable, and bump use_count only when a row was
+# actually inserted. The invite is returned either way so the caller can
+# tell why nothing happened. The conflict target is board_members' primary
+# key, so an existing membership is a no-op rather than an error.
+ACCEPT_INVITE = text("""
+    WITH inv AS (
+        SELECT i.id, i.board_id, i.role, i.expires_at, i.max_uses, i.use_count,
+               b.deleted_at IS NOT NULL AS board_deleted
+        FROM board_invites i
+        JOIN boards b ON b.id = i.board_id
+        WHERE i.id = :invite_id
+        FOR UPDATE OF i
+    ),
+    ins AS (
+        INSERT INTO board_members (board_id, user_id, role)
+        SELECT board_id, :user_id, role FROM inv
+        WHERE NOT board_deleted
+          AND (expires_at IS NULL OR expires_at >= now() AT TIME ZONE 'utc')
+          AND (COALESCE(max_uses, 0) = 0 OR use_count < max_uses)
+        ON CONFLICT (board_id, user_id) DO NOTHING
+        RETURNING board_id
+    ),
+    upd AS (
+        UPDATE board_invites SET use_count = use_count + 1
+        WHERE id = :invite_id AND EXISTS (SELECT 1 FROM ins)
     )
+    SELECT inv.board_id, inv.expires_at, inv.max_uses, inv.use_count, inv.board_deleted,
+           EXISTS (SELECT 1 FROM ins) AS joined
+    FROM inv
+""")
 
 
 @router.post("/invites/{invite_id}/accept")
@@ -120,100 +159,78 @@ async def accept_invite(
     db: AsyncSession = Depends(get_db),
 ):
     """Accept an invite and join the board."""
-    result = await db.execute(
-        select(BoardInvite)
-        .options(selectinload(BoardInvite.board))
-        .where(BoardInvite.id == invite_id)
-    )
-    invite = result.scalar_one_or_none()
+    result = await db.execute(ACCEPT_INVITE, {"invite_id": invite_id, "user_id": user.id})
+    invite = result.one_or_none()
 
     if not invite:
         raise HTTPException(status_code=404, detail="Invite not found")
 
-    # Check if expired
+    # Nothing was written unless all of these checks passed in SQL; they're
+    # repeated here only to pick the error message
     if invite.expires_at and invite.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="This invite has expired")
 
-    # Check max uses
     if invite.max_uses and invite.use_count >= invite.max_uses:
         raise HTTPException(status_code=400, detail="This invite has reached its maximum uses")
 
-    # Check if board still exists
-    if invite.board.deleted_at:
+    if invite.board_deleted:
         raise HTTPException(status_code=404, detail="Board no longer exists")
 
-    # Check if already a member
-    result = await db.execute(
-        select(BoardMember).where(
-            BoardMember.board_id == invite.board_id,
-            BoardMember.user_id == user.id,
-        )
-    )
-    existing = result.scalar_one_or_none()
+    await db.commit()
 
-    # Capture board_id before any potential rollback (to avoid lazy loading issues)
     board_id_str = str(invite.board_id)
-
-    if existing:
-        return {"message": "You are already a member of this board", "board_id": board_id_str}
-
-    # Add as member
-    member = BoardMember(
-        board_id=invite.board_id,
-        user_id=user.id,
-        role=invite.role,
-    )
-    db.add(member)
-
-    # Increment use count
-    invite.use_count += 1
-
-    try:
-        await db.commit()
-    except IntegrityError:
-        # Race condition - user was added between check and insert
-        await db.rollback()
+    if not invite.joined:
         return {"message": "You are already a member of this board", "board_id": board_id_str}
 
     return {"message": "Successfully joined the board", "board_id": board_id_str}
 
 
 # Member management endpoints
-@router.get("/boards/{board_id}/members", response_model=list[MemberResponse])
+@router.get("/boards/{board_id}/members", response_model=list[MemberResponse], response_class=ORJSONResponse)
 async def list_members(
     board_id: str,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """List all members of a board."""
+    is_member = is_board_member(user.id)
     result = await db.execute(
-        select(Board)
-        .options(selectinload(Board.members).selectinload(BoardMember.user))
-        .where(Board.id == board_id, Board.deleted_at.is_(None))
+        select(Board.owner_id, is_member).where(Board.id == board_id, Board.deleted_at.is_(None))
     )
-    board = result.scalar_one_or_none()
+    board = result.one_or_none()
 
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
 
     # Check access
-    is_owner = board.owner_id == user.id
-    is_member = any(m.user_id == user.id for m in board.members)
-
-    if not is_owner and not is_member:
+    if board.owner_id != user.id and not board.is_member:
         raise HTTPException(status_code=403, detail="You don't have access to this board")
 
-    return [
-        MemberResponse(
-            user_id=str(m.user_id),
-            name=m.user.name,
-            email=m.user.email,
-            avatar_url=m.user.avatar_url,
-            role=m.role,
-            invited_at=m.invited_at,
+    # Select just the response columns instead of hydrating members and users
+    result = await db.execute(
+        select(
+            BoardMember.user_id,
+            User.name,
+            User.email,
+            User.avatar_url,
+            BoardMember.role,
+            BoardMember.invited_at,
         )
-        for m in board.members
-    ]
+        .join(User, User.id == BoardMember.user_id)
+        .where(BoardMember.board_id == board_id)
+    )
+
+    return ORJSONResponse([
+        {
+            "user_id": str(row.user_id),
+            "name": row.name,
+            "email": row.email,
+            "avatar_url": row.avatar_url,
+            "role": row.role,
+            "invited_at": row.invited_at,
+        }
+        for row in result
+    ])
 
 
 @router.patch("/boards/{board_id}/members/{user_id}", response_model=MemberResponse)
@@ -236,7 +253,7 @@ async def update_member_role(
 
     result = await db.execute(
         select(BoardMember)
-        .options(selectinload(BoardMember.user))
+        .options(selectinload(BoardMember.user), raiseload("*"))
         .where(BoardMember.board_id == board_id, BoardMember.user_id == user_id)
     )
     member = result.scalar_one_or_none()
@@ -244,17 +261,20 @@ async def update_member_role(
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
+    # Only the role changes and the member (with its user) is already loaded,
+    # so there's nothing to refresh after the commit
     member.role = data.role
     await db.commit()
-    await db.refresh(member)
-
-    return MemberResponse(
-        user_id=str(member.user_id),
-        name=member.user.name,
-        email=member.user.email,
-        avatar_url=member.user.avatar_url,
-        role=member.role,
-        invited_at=member.invited_at,
+
+    return PydanticResponse(
+        MemberResponse.model_construct(
+            user_id=str(member.user_id),
+            name=member.user.name,
+            email=member.user.email,
+            avatar_url=member.user.avatar_url,
+            role=member.role,
+            invited_at=member.invited_at,
+        ),
     )
 
 
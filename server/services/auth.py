@@ -1,11 +1,29 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import jwt, JWTError
+from functools import lru_cache
+import asyncio
+import time
+import jwt
+from cachetools import TTLCache
 from authlib.integrations.httpx_client import AsyncOAuth2Client
 import httpx
+import orjson
 
 from config import settings
 
+# Shared client so repeat OAuth logins reuse keep-alive connections to the
+# provider APIs instead of paying a TLS handshake each time
+http_client = httpx.AsyncClient(
+    timeout=10.0,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client on shutdown."""
+    await http_client.aclose()
+
+
 # JWT Token functions
 def create_access_token(user_id: str) -> str:
     """Create a JWT access token."""
@@ -29,27 +47,105 @@ def create_refresh_token(user_id: str) -> str:
     return jwt.encode(payload, settings.secret_key, algorithm=settings.jwt_algorithm)
 
 
+# Recently verified tokens -> (sub, type, exp). A client sends the same token
+# on every request, so repeat hits skip the signature check and JSON decode.
+# Only tokens with a valid signature are cached, and expiry is checked per call.
+_verified_tokens = TTLCache(maxsize=10000, ttl=60)
+
+
+def _decode_claims(token: str) -> Optional[tuple]:
+    """Check a token's signature and return its (sub, type, exp) claims.
+
+    Expiry is left to _check_claims, so an expired but genuine token still
+    decodes. Touches no shared state, so it is safe to run in a worker thread.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.secret_key,
+            algorithms=[settings.jwt_algorithm],
+            options={"verify_exp": False},
+        )
+    except jwt.InvalidTokenError:
+        return None
+    exp = payload.get("exp")
+    if exp is not None and not isinstance(exp, (int, float)):
+        return None
+    return (payload.get("sub"), payload.get("type"), exp)
+
+
+def _check_claims(claims: tuple, token_type: str) -> Optional[str]:
+    """Return the user_id if the claims are unexpired and of the right type."""
+    sub, type_, exp = claims
+    if exp is not None and exp <= time.time():
+        return None
+    if type_ != token_type:
+        return None
+    return sub
+
+
 def verify_token(token: str, token_type: str = "access") -> Optional[str]:
     """Verify a JWT token and return the user_id if valid."""
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
-        if payload.get("type") != token_type:
+    claims = _verified_tokens.get(token)
+    if claims is None:
+        claims = _decode_claims(token)
+        if claims is None:
             return None
-        return payload.get("sub")
-    except JWTError:
+        _verified_tokens[token] = claims
+    return _check_claims(claims, token_type)
+
+
+async def _decode_claims_async(token: str) -> Optional[tuple]:
+    """Cached _decode_claims that doesn't block the event loop on a miss."""
+    claims = _verified_tokens.get(token)
+    if claims is None:
+        # Only the signature check runs on the default executor (matters for
+        # RS/ES keys); TTLCache isn't thread-safe, so it's only ever read and
+        # written here on the event loop thread
+        claims = await asyncio.to_thread(_decode_claims, token)
+        if claims is not None:
+            _verified_tokens[token] = claims
+    return claims
+
+
+async def verify_token_async(token: str, token_type: str = "access") -> Optional[str]:
+    """Verify a JWT token without blocking the event loop on a cache miss."""
+    claims = await _decode_claims_async(token)
+    if claims is None:
         return None
+    return _check_claims(claims, token_type)
+
+
+async def verify_websocket_token(token: str) -> tuple[bool, Optional[str]]:
+    """Check the access token a WebSocket client connects with.
+
+    Returns (accepted, user_id). A genuine access token that has expired is
+    accepted with no user_id: the client keeps it in the connection URL and
+    only refreshes it on a REST 401, so refusing it would make it reconnect
+    forever. Forged, malformed or non-access tokens are not accepted.
+    """
+    claims = await _decode_claims_async(token)
+    if claims is None or claims[1] != "access":
+        return False, None
+    return True, _check_claims(claims, "access")
 
 
 # Google OAuth
-async def get_google_auth_url(redirect_uri: str) -> str:
-    """Get the Google OAuth authorization URL."""
-    client = AsyncOAuth2Client(
+@lru_cache(maxsize=4)
+def _google_auth_client(redirect_uri: str) -> AsyncOAuth2Client:
+    """Build the client used to create authorization URLs once per redirect URI."""
+    return AsyncOAuth2Client(
         client_id=settings.google_client_id,
         client_secret=settings.google_client_secret,
         redirect_uri=redirect_uri,
         scope="openid email profile",
     )
-    url, _ = client.create_authorization_url("https://accounts.google.com/o/oauth2/v2/auth")
+
+
+async def get_google_auth_url(redirect_uri: str) -> str:
+    """Get the Google OAuth authorization URL."""
+    # A fresh state is still generated per call
+    url, _ = _google_auth_client(redirect_uri).create_authorization_url("https://accounts.google.com/o/oauth2/v2/auth")
     return url
 
 
@@ -67,24 +163,29 @@ async def get_google_user(code: str, redirect_uri: str) -> dict:
     )
 
     # Get user info
-    async with httpx.AsyncClient() as http_client:
-        response = await http_client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {token['access_token']}"},
-        )
-        return response.json()
+    response = await http_client.get(
+        "https://www.googleapis.com/oauth2/v2/userinfo",
+        headers={"Authorization": f"Bearer {token['access_token']}"},
+    )
+    return orjson.loads(response.content)
 
 
 # GitHub OAuth
-async def get_github_auth_url(redirect_uri: str) -> str:
-    """Get the GitHub OAuth authorization URL."""
-    client = AsyncOAuth2Client(
+@lru_cache(maxsize=4)
+def _github_auth_client(redirect_uri: str) -> AsyncOAuth2Client:
+    """Build the client used to create authorization URLs once per redirect URI."""
+    return AsyncOAuth2Client(
         client_id=settings.github_client_id,
         client_secret=settings.github_client_secret,
         redirect_uri=redirect_uri,
         scope="user:email",
     )
-    url, _ = client.create_authorization_url("https://github.com/login/oauth/authorize")
+
+
+async def get_github_auth_url(redirect_uri: str) -> str:
+    """Get the GitHub OAuth authorization URL."""
+    # A fresh state is still generated per call
+    url, _ = _github_auth_client(redirect_uri).create_authorization_url("https://github.com/login/oauth/authorize")
     return url
 
 
@@ -101,31 +202,30 @@ async def get_github_user(code: str, redirect_uri: str) -> dict:
         code=code,
     )
 
-    async with httpx.AsyncClient() as http_client:
-        # Get user profile
-        response = await http_client.get(
-            "https://api.github.com/user",
+    # Get user profile
+    response = await http_client.get(
+        "https://api.github.com/user",
+        headers={
+            "Authorization": f"Bearer {token['access_token']}",
+            "Accept": "application/json",
+        },
+    )
+    user_data = orjson.loads(response.content)
+
+    # Get user email if not public
+    if not user_data.get("email"):
+        email_response = await http_client.get(
+            "https://api.github.com/user/emails",
             headers={
                 "Authorization": f"Bearer {token['access_token']}",
                 "Accept": "application/json",
             },
         )
-        user_data = response.json()
-
-        # Get user email if not public
-        if not user_data.get("email"):
-            email_response = await http_client.get(
-                "https://api.github.com/user/emails",
-                headers={
-                    "Authorization": f"Bearer {token['access_token']}",
-                    "Accept": "application/json",
-                },
-            )
-            emails = email_response.json()
-            primary_email = next(
-                (e["email"] for e in emails if e.get("primary")),
-                emails[0]["email"] if emails else None,
-            )
-            user_data["email"] = primary_email
-
-        return user_data
+        emails = orjson.loads(email_response.content)
+        primary_email = next(
+            (e["email"] for e in emails if e.get("primary")),
+            emails[0]["email"] if emails else None,
+        )
+        user_data["email"] = primary_email
+
+    return user_data
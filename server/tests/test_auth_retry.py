@@ -0,0 +1,91 @@
+"""
+Tests for the database retry used by the auth routes.
+"""
+import types
+import unittest
+from unittest import mock
+
+import asyncpg
+from sqlalchemy.dialects.postgresql.asyncpg import (
+    AsyncAdapt_asyncpg_connection,
+    AsyncAdapt_asyncpg_dbapi,
+)
+from sqlalchemy.exc import DBAPIError
+
+from routes import auth
+
+DBAPI = AsyncAdapt_asyncpg_dbapi(asyncpg)
+
+
+def asyncpg_error(error: Exception) -> DBAPIError:
+    """Wrap an asyncpg exception the way SQLAlchemy raises it from execute()."""
+    # Run it through the dialect's own translation so the result matches what
+    # the routes see at runtime: an adapted DBAPI error raised from the asyncpg one
+    adapter = types.SimpleNamespace(
+        _connection=types.SimpleNamespace(is_closed=lambda: False),
+        dbapi=DBAPI,
+    )
+    try:
+        AsyncAdapt_asyncpg_connection._handle_exception(adapter, error)
+    except DBAPI.Error as translated:
+        return DBAPIError.instance("SELECT 1", {}, translated, DBAPI.Error)
+    raise AssertionError(f"{error!r} was not translated")
+
+
+class FakeSession:
+    """Session whose execute() raises the given errors before succeeding."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.executes = 0
+        self.rollbacks = 0
+
+    async def execute(self, query, params=None):
+        self.executes += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "result"
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@mock.patch.object(auth, "DB_RETRY_DELAYS", (0, 0, 0))
+class ExecuteWithRetryTests(unittest.IsolatedAsyncioTestCase):
+    async def test_retries_admin_shutdown(self):
+        error = asyncpg_error(asyncpg.exceptions.AdminShutdownError("terminating connection"))
+        self.assertTrue(auth.is_transient_db_error(error))
+
+        db = FakeSession(error)
+        self.assertEqual(await auth.execute_with_retry(db, "SELECT 1"), "result")
+        self.assertEqual(db.executes, 2)
+        self.assertEqual(db.rollbacks, 1)
+
+    async def test_retries_lost_connection(self):
+        error = asyncpg_error(asyncpg.exceptions.ConnectionDoesNotExistError("connection was closed"))
+
+        db = FakeSession(error, error)
+        self.assertEqual(await auth.execute_with_retry(db, "SELECT 1"), "result")
+        self.assertEqual(db.executes, 3)
+
+    async def test_gives_up_after_last_attempt(self):
+        error = asyncpg_error(asyncpg.exceptions.CannotConnectNowError("starting up"))
+
+        db = FakeSession(*[error] * 4)
+        with self.assertRaises(DBAPIError):
+            await auth.execute_with_retry(db, "SELECT 1")
+        self.assertEqual(db.executes, 4)
+
+    async def test_does_not_retry_other_errors(self):
+        error = asyncpg_error(asyncpg.exceptions.UniqueViolationError("duplicate key"))
+        self.assertFalse(auth.is_transient_db_error(error))
+
+        db = FakeSession(error)
+        with self.assertRaises(DBAPIError):
+            await auth.execute_with_retry(db, "SELECT 1")
+        self.assertEqual(db.executes, 1)
+        self.assertEqual(db.rollbacks, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
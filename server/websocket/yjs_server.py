@@ -1,28 +1,100 @@
 """
 Yjs WebSocket server using pycrdt-websocket.
 """
+import asyncio
 import logging
-from typing import Optional
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
 from starlette.websockets import WebSocketState
 
+from pycrdt import Decoder, YMessageType, read_message
 from pycrdt.websocket import WebsocketServer
 
-from services.auth import verify_token
+from config import settings
+from services.auth import verify_websocket_token
 
 logger = logging.getLogger(__name__)
 
 websocket_server = WebsocketServer(auto_clean_rooms=True)
 router = APIRouter()
 
+# Module-level aliases to skip attribute lookups; enum members are singletons,
+# so state checks can compare by identity
+WS_CONNECTED = WebSocketState.CONNECTED
+QueueEmpty = asyncio.QueueEmpty
+QueueFull = asyncio.QueueFull
+
+
+def awareness_client_ids(message: bytes) -> Optional[frozenset[int]]:
+    """Get the client ids an awareness message updates, or None for other messages."""
+    if not message or message[0] != YMessageType.AWARENESS:
+        return None
+    try:
+        decoder = Decoder(read_message(message[1:]))
+        client_ids = set()
+        for _ in range(decoder.read_var_uint()):
+            client_ids.add(decoder.read_var_uint())
+            decoder.read_var_uint()  # clock
+            decoder.read_message()  # JSON state
+        return frozenset(client_ids)
+    except Exception:
+        # Not in the wire format we expect; leave the message alone
+        return None
+
+
+def coalesce_awareness(batch: list[bytes]) -> list[bytes]:
+    """Drop awareness messages whose clients all get a newer state later in the batch.
+
+    Awareness is last-writer-wins per client, so only the latest state of
+    each client (cursor position, selection, ...) needs to reach the peer.
+    Sync messages and the relative order of what's kept are untouched.
+    """
+    kept = []
+    covered = set()
+    for message in reversed(batch):
+        client_ids = awareness_client_ids(message)
+        if client_ids:
+            if client_ids <= covered:
+                continue
+            covered |= client_ids
+        kept.append(message)
+    kept.reverse()
+    return kept
+
 
 class WebsocketAdapter:
     """Adapts FastAPI WebSocket to pycrdt-websocket interface."""
 
+    # One instance per connection; slots avoid a per-instance __dict__
+    __slots__ = (
+        "_websocket",
+        "_path",
+        "_alive",
+        "_closed",
+        "_out_queue",
+        "_writer_task",
+        "_in_queue",
+        "_reader_task",
+    )
+
     def __init__(self, websocket: WebSocket, path: str):
         self._websocket = websocket
         self._path = path
-        self._closed = False
+        # Cleared on disconnect/close so send() needs no socket state lookup
+        self._alive = True
+        # Set once the writer stops for good, waking any send() blocked on a
+        # full queue that would otherwise never drain
+        self._closed = asyncio.Event()
+        # Sends are queued and flushed by a single writer task, so a burst of
+        # updates goes out back to back instead of one awaited write each
+        self._out_queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=settings.ws_send_queue)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        # Incoming messages go through a bounded queue filled by a reader
+        # task. When pycrdt falls behind the reader blocks on put(), which
+        # stops reading the socket and pushes back on the client over TCP
+        # instead of buffering without limit. None marks the end of input.
+        self._in_queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=settings.ws_recv_queue)
+        self._reader_task = asyncio.create_task(self._reader_loop())
 
     @property
     def path(self) -> str:
@@ -30,36 +102,162 @@ class WebsocketAdapter:
 
     async def recv(self) -> bytes:
         """Receive a message."""
-        return await self._websocket.receive_bytes()
+        message = await self._next_message()
+        if message is None:
+            raise WebSocketDisconnect()
+        return message
+
+    async def _next_message(self) -> Optional[bytes]:
+        """Take the next received message, or None once input has ended."""
+        message = await self._in_queue.get()
+        if message is None:
+            # Leave the end marker for any later reads; the reader has
+            # stopped, so there is room for it
+            self._in_queue.put_nowait(None)
+        return message
+
+    async def _reader_loop(self) -> None:
+        """Move messages from the socket into the receive queue."""
+        # Bound once so the per-message loop only touches locals
+        receive_bytes = self._websocket.receive_bytes
+        put = self._in_queue.put
+        try:
+            while True:
+                await put(await receive_bytes())
+        except WebSocketDisconnect:
+            pass
+        except Exception:
+            # Anything else (e.g. a text frame) is a real error; end the
+            # connection but don't hide it
+            logger.exception("WebSocket receive failed: room=%s", self._path)
+        self._alive = False
+        # Waits for room if the consumer is behind; close() cancels the wait
+        # if the consumer has gone away
+        await self._in_queue.put(None)
 
     async def send(self, message: bytes) -> None:
-        """Send a message."""
-        if not self._closed and self._websocket.client_state == WebSocketState.CONNECTED:
-            await self._websocket.send_bytes(message)
+        """Queue a message for the writer task."""
+        if not self._alive:
+            return
+        try:
+            self._out_queue.put_nowait(message)
+        except QueueFull:
+            # The client isn't keeping up; apply the configured policy
+            # instead of buffering without limit
+            policy = settings.ws_bp_policy
+            if policy == "block":
+                await self._put_until_closed(message)
+            elif policy == "drop_oldest" and self._drop_awareness():
+                self._out_queue.put_nowait(message)
+            else:
+                logger.warning("WebSocket send queue full, disconnecting: room=%s", self._path)
+                await self._disconnect()
+
+    async def _put_until_closed(self, message: bytes) -> None:
+        """Wait for room in the send queue, giving up if the adapter closes."""
+        put = asyncio.ensure_future(self._out_queue.put(message))
+        closed = asyncio.ensure_future(self._closed.wait())
+        try:
+            await asyncio.wait((put, closed), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            put.cancel()
+            closed.cancel()
+
+    def _drop_awareness(self) -> bool:
+        """Free space in the full send queue by dropping awareness updates.
+
+        Superseded awareness updates go first, then the oldest one. Sync
+        messages are never dropped, since the client's document would silently
+        diverge; returns False if there was nothing safe to drop.
+        """
+        queue = self._out_queue
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        kept = coalesce_awareness(pending)
+        if len(kept) == len(pending):
+            for i, message in enumerate(kept):
+                if message[0] == YMessageType.AWARENESS:
+                    del kept[i]
+                    break
+        for message in kept:
+            queue.put_nowait(message)
+        return len(kept) < len(pending)
+
+    async def _disconnect(self) -> None:
+        """Drop a client that can't keep up; it resyncs when it reconnects."""
+        self._alive = False
+        self._closed.set()
+        # Stop the writer first so nothing is sent while closing
+        self._writer_task.cancel()
+        if self._websocket.client_state is WS_CONNECTED:
+            await self._websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    async def _writer_loop(self) -> None:
+        """Send queued messages, draining everything available per wakeup."""
+        queue = self._out_queue
+        get_nowait = queue.get_nowait
+        send_bytes = self._websocket.send_bytes
+        coalesce = settings.ws_coalesce_awareness
+        try:
+            while True:
+                batch = [await queue.get()]
+                while True:
+                    try:
+                        batch.append(get_nowait())
+                    except QueueEmpty:
+                        break
+                if coalesce and len(batch) > 1:
+                    batch = coalesce_awareness(batch)
+                # Yjs clients decode exactly one message per frame, so the
+                # batch can't be concatenated; flush it without going back to
+                # the queue in between
+                for message in batch:
+                    await send_bytes(message)
+        except (WebSocketDisconnect, RuntimeError):
+            # The socket went away mid-send; stop accepting messages
+            pass
+        finally:
+            # Nothing drains the queue from here on
+            self._alive = False
+            self._closed.set()
 
     async def close(self) -> None:
         """Close the connection."""
-        self._closed = True
-        if self._websocket.client_state == WebSocketState.CONNECTED:
+        self._alive = False
+        self._closed.set()
+        self._writer_task.cancel()
+        self._reader_task.cancel()
+        if self._websocket.client_state is WS_CONNECTED:
             await self._websocket.close()
 
-    def __aiter__(self):
-        """Return async iterator."""
-        return self
+    def release(self) -> None:
+        """Drop references to the socket, queues and tasks after close().
 
-    async def __anext__(self) -> bytes:
-        """Get next message from WebSocket."""
-        try:
-            if self._closed or self._websocket.client_state != WebSocketState.CONNECTED:
-                raise StopAsyncIteration
-            data = await self._websocket.receive_bytes()
-            return data
-        except WebSocketDisconnect:
-            self._closed = True
-            raise StopAsyncIteration
-        except Exception:
-            self._closed = True
-            raise StopAsyncIteration
+        pycrdt may still hold the adapter briefly (e.g. a broadcast task that
+        hasn't run yet); this keeps it from pinning the Starlette WebSocket and
+        any buffered messages until the cycle collector runs. send() is a no-op
+        afterwards since the adapter is no longer alive.
+        """
+        self._alive = False
+        self._websocket = None
+        self._out_queue = None
+        self._in_queue = None
+        self._writer_task = None
+        self._reader_task = None
+
+    def __del__(self) -> None:
+        # Helps spot adapters that outlive their connection
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("WebsocketAdapter freed: room=%s", self._path)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        """Yield received messages until the connection ends."""
+        while True:
+            message = await self._next_message()
+            if message is None:
+                return
+            yield message
 
 
 @router.websocket("/ws/{room_name}")
@@ -68,23 +266,47 @@ async def websocket_endpoint(
     room_name: str,
     token: Optional[str] = Query(default=None),
 ):
-    logger.info(f"WebSocket connection: room={room_name}")
-    
-    # Optional auth
+    # Logging is lazy (%-style) so filtered-out records cost no formatting
+    if logger.isEnabledFor(logging.INFO):
+        client_host = websocket.client.host if websocket.client else None
+        logger.info(
+            "WebSocket connection: room=%s ip=%s has_token=%s",
+            room_name, client_host, token is not None,
+        )
+
+    # Optional auth, but a forged or malformed token is refused before the
+    # handshake completes (the server answers the upgrade with a 403). An
+    # expired one just connects anonymously.
     if token:
-        user_id = verify_token(token)
+        accepted, user_id = await verify_websocket_token(token)
+        if not accepted:
+            logger.info("WebSocket rejected, invalid token: room=%s", room_name)
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
         if user_id:
-            logger.info(f"Authenticated: {user_id}")
+            logger.info("Authenticated: %s", user_id)
+        else:
+            logger.info("Expired token, connecting anonymously: room=%s", room_name)
 
     await websocket.accept()
-    
+
     adapter = WebsocketAdapter(websocket, room_name)
-    
+
+    # Serve inline on the connection's own task rather than spawning one, but
+    # name it so connections can be told apart in task dumps. Each connection
+    # then runs three tasks: this one plus the adapter's reader and writer.
+    asyncio.current_task().set_name(f"yjs-room-{room_name}")
     try:
         await websocket_server.serve(adapter)
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected: room={room_name}")
+        logger.info("WebSocket disconnected: room=%s", room_name)
     except Exception as e:
-        logger.error(f"WebSocket error: {e}", exc_info=True)
-    
-    logger.info(f"WebSocket closed: room={room_name}")
\ No newline at end of file
+        logger.error("WebSocket error: %s", e, exc_info=True)
+    finally:
+        # serve() has returned (or been cancelled), so the room has dropped
+        # this client. Stop the reader and writer tasks and break the
+        # adapter's references so the connection's memory is freed right away
+        await adapter.close()
+        adapter.release()
+
+    logger.info("WebSocket closed: room=%s", room_name)
\ No newline at end of file